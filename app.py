@@ -36,6 +36,11 @@ FULL_NAMESPACE  = "demo-html"
 FAQ_INDEX_NAME = "concur-index-faq"  
 FAQ_NAMESPACE  = "demo-html"
 
+# 各モードで取得するチャンク数 (eval_retrieval.py で評価・調整する)
+SUMMARY_K = 3
+DETAIL_K  = 5
+FAQ_K     = 5
+
 WORKFLOW_GUIDES = [
     "ワークフロー（概要）(2023年10月14日版)",
     "ワークフロー（承認権限者）(2023年8月25日版)",
@@ -181,16 +186,16 @@ def main():
     def get_summary_retriever():
         if focus_guide_selected != "なし":
             filter_conf = {"GuideNameJp": {"$eq": focus_guide_selected}}
-            return docsearch_summary.as_retriever(search_kwargs={"k": 3, "filter": filter_conf})
+            return docsearch_summary.as_retriever(search_kwargs={"k": SUMMARY_K, "filter": filter_conf})
         else:
-            return docsearch_summary.as_retriever(search_kwargs={"k": 3})
+            return docsearch_summary.as_retriever(search_kwargs={"k": SUMMARY_K})
 
     def get_detail_retriever():
         if focus_guide_selected != "なし":
             filter_conf = {"GuideNameJp": {"$eq": focus_guide_selected}}
-            return docsearch_full.as_retriever(search_kwargs={"k": 5, "filter": filter_conf})
+            return docsearch_full.as_retriever(search_kwargs={"k": DETAIL_K, "filter": filter_conf})
         else:
-            return docsearch_full.as_retriever(search_kwargs={"k": 5})
+            return docsearch_full.as_retriever(search_kwargs={"k": DETAIL_K})
 
     def post_process_answer(user_question: str, raw_answer: str) -> str:
         # ワークフローが質問文に含まれ、かつ仮払いが含まれていない場合のみガイドURLを追加
@@ -235,10 +240,10 @@ def main():
 
     # FAQ用のチェーンを定義（FAQインデックスを参照）
     def run_faq_chain(query_text: str):
-        # FAQはとりあえずフィルタなし(k=5)で検索する例
+        # FAQはとりあえずフィルタなし(k=FAQ_K)で検索する例
         chain = ConversationalRetrievalChain.from_llm(
             llm=chat_llm,
-            retriever=docsearch_faq.as_retriever(search_kwargs={"k": 5}),
+            retriever=docsearch_faq.as_retriever(search_kwargs={"k": FAQ_K}),
             return_source_documents=True,
             combine_docs_chain_kwargs={"prompt": custom_prompt}
         )
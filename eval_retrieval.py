@@ -0,0 +1,299 @@
+"""
+検索品質 vs レイテンシのベンチマーク
+
+ラベル付きの質問セット (JSONL) に対して、モード (summary / detail / faq) ごとに
+k・フィルタ有無・検索方式 (similarity / mmr) の組み合わせを評価し、
+recall@k / MRR / プロンプトトークン数 / レイテンシ を集計してパレート最適な設定を出力する。
+
+質問セットの形式 (1行1問):
+    {"question": "勘定科目コードの概要", "mode": "summary",
+     "guide": "ワークフロー（概要）(2023年10月14日版)",
+     "expected": [{"FullLink": "https://...", "SectionTitle": "..."}]}
+
+- mode     : summary / detail / faq のいずれか
+- guide    : 任意。指定した場合のみフィルタ有りの設定で GuideNameJp フィルタを掛ける
+- expected : 正解チャンク。FullLink は必須、SectionTitle は任意
+             (SectionTitle1 / SectionTitle2 のどちらかと一致すれば正解扱い)
+
+使い方:
+    python eval_retrieval.py eval_questions.jsonl --k 1 3 5 8 --search-types similarity mmr
+    python eval_retrieval.py eval_questions.jsonl --with-llm   # LLM 回答生成まで含めて計測
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import statistics
+
+import tiktoken
+from pinecone import Pinecone
+from langchain_openai import OpenAIEmbeddings
+from langchain_pinecone import PineconeVectorStore
+from langchain.chat_models import ChatOpenAI
+
+from app import (
+    OPENAI_API_KEY,
+    PINECONE_API_KEY,
+    PINECONE_ENVIRONMENT,
+    SUMMARY_INDEX_NAME,
+    SUMMARY_NAMESPACE,
+    FULL_INDEX_NAME,
+    FULL_NAMESPACE,
+    FAQ_INDEX_NAME,
+    FAQ_NAMESPACE,
+    SUMMARY_K,
+    DETAIL_K,
+    FAQ_K,
+    custom_prompt,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# モードごとのインデックス設定 (app.py と同じものを使う)
+# --------------------------------------------------
+MODE_INDEXES = {
+    "summary": (SUMMARY_INDEX_NAME, SUMMARY_NAMESPACE),
+    "detail":  (FULL_INDEX_NAME, FULL_NAMESPACE),
+    "faq":     (FAQ_INDEX_NAME, FAQ_NAMESPACE),
+}
+CURRENT_K = {"summary": SUMMARY_K, "detail": DETAIL_K, "faq": FAQ_K}
+
+DEFAULT_K_VALUES = [1, 3, 5, 8, 10]
+DEFAULT_SEARCH_TYPES = ["similarity", "mmr"]
+TOKEN_MODEL = "gpt-4"
+
+
+def load_questions(path):
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if item.get("mode") not in MODE_INDEXES:
+                raise ValueError(f"{path}:{line_no} mode が不正です: {item.get('mode')}")
+            if not item.get("expected"):
+                raise ValueError(f"{path}:{line_no} expected が空です")
+            questions.append(item)
+    return questions
+
+
+# --------------------------------------------------
+# 評価指標
+# --------------------------------------------------
+def is_relevant(meta, expected):
+    if meta.get("FullLink", "") != expected.get("FullLink"):
+        return False
+    section = expected.get("SectionTitle")
+    if not section:
+        return True
+    return section in (meta.get("SectionTitle1", ""), meta.get("SectionTitle2", ""))
+
+
+def recall_at_k(meta_list, expected_list):
+    hit = sum(1 for exp in expected_list if any(is_relevant(m, exp) for m in meta_list))
+    return hit / len(expected_list)
+
+
+def reciprocal_rank(meta_list, expected_list):
+    for rank, meta in enumerate(meta_list, start=1):
+        if any(is_relevant(meta, exp) for exp in expected_list):
+            return 1.0 / rank
+    return 0.0
+
+
+def count_prompt_tokens(encoding, docs, question):
+    # ConversationalRetrievalChain (stuff) と同じく page_content を改行2つで連結
+    context = "\n\n".join(d.page_content for d in docs)
+    return len(encoding.encode(custom_prompt.format(context=context, question=question)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+# --------------------------------------------------
+# 検索の実行
+# --------------------------------------------------
+def build_vectorstores(embeddings):
+    pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
+    stores = {}
+    for mode, (index_name, namespace) in MODE_INDEXES.items():
+        stores[mode] = PineconeVectorStore(
+            embedding=embeddings,
+            index=pc.Index(index_name),
+            namespace=namespace,
+            text_key="chunk_text"
+        )
+    return stores
+
+
+def search(store, vector, k, search_type, filter_conf):
+    if search_type == "mmr":
+        return store.max_marginal_relevance_search_by_vector(
+            vector, k=k, fetch_k=max(20, k * 4), filter=filter_conf
+        )
+    return store.similarity_search_by_vector(vector, k=k, filter=filter_conf)
+
+
+def evaluate(questions, stores, embeddings, k_values, search_types, chat_llm=None):
+    encoding = tiktoken.encoding_for_model(TOKEN_MODEL)
+    samples = {}
+
+    for q_idx, item in enumerate(questions, start=1):
+        mode = item["mode"]
+        question = item["question"]
+        expected = item["expected"]
+        guide = item.get("guide")
+
+        # 質問の埋め込みは1回だけ計算し、その時間を全設定のレイテンシに加算する
+        t0 = time.perf_counter()
+        vector = embeddings.embed_query(question)
+        embed_ms = (time.perf_counter() - t0) * 1000
+
+        filter_options = [False, True] if guide else [False]
+        for search_type in search_types:
+            for use_filter in filter_options:
+                filter_conf = {"GuideNameJp": {"$eq": guide}} if use_filter else None
+                for k in k_values:
+                    t0 = time.perf_counter()
+                    docs = search(stores[mode], vector, k, search_type, filter_conf)
+                    retrieve_ms = (time.perf_counter() - t0) * 1000
+
+                    llm_ms = 0.0
+                    if chat_llm is not None:
+                        context = "\n\n".join(d.page_content for d in docs)
+                        t0 = time.perf_counter()
+                        chat_llm.predict(custom_prompt.format(context=context, question=question))
+                        llm_ms = (time.perf_counter() - t0) * 1000
+
+                    meta_list = [d.metadata for d in docs]
+                    key = (mode, search_type, use_filter, k)
+                    samples.setdefault(key, []).append({
+                        "recall": recall_at_k(meta_list, expected),
+                        "rr": reciprocal_rank(meta_list, expected),
+                        "tokens": count_prompt_tokens(encoding, docs, question),
+                        "retrieve_ms": retrieve_ms,
+                        "e2e_ms": embed_ms + retrieve_ms + llm_ms,
+                    })
+        logger.info(f"[{q_idx}/{len(questions)}] 評価完了: {question}")
+
+    results = []
+    for (mode, search_type, use_filter, k), rows in samples.items():
+        e2e = [r["e2e_ms"] for r in rows]
+        results.append({
+            "mode": mode,
+            "search_type": search_type,
+            "filter": use_filter,
+            "k": k,
+            "current": k == CURRENT_K[mode] and search_type == "similarity",
+            "n": len(rows),
+            "recall_at_k": statistics.mean(r["recall"] for r in rows),
+            "mrr": statistics.mean(r["rr"] for r in rows),
+            "prompt_tokens": statistics.mean(r["tokens"] for r in rows),
+            "retrieve_ms_p50": percentile([r["retrieve_ms"] for r in rows], 50),
+            "e2e_ms_p50": percentile(e2e, 50),
+            "e2e_ms_p95": percentile(e2e, 95),
+        })
+    return results
+
+
+# --------------------------------------------------
+# パレート最適の抽出・レポート出力
+# --------------------------------------------------
+def dominates(a, b):
+    # recall / MRR は大きいほど良く、トークン数・レイテンシは小さいほど良い
+    no_worse = (
+        a["recall_at_k"] >= b["recall_at_k"]
+        and a["mrr"] >= b["mrr"]
+        and a["prompt_tokens"] <= b["prompt_tokens"]
+        and a["e2e_ms_p50"] <= b["e2e_ms_p50"]
+    )
+    better = (
+        a["recall_at_k"] > b["recall_at_k"]
+        or a["mrr"] > b["mrr"]
+        or a["prompt_tokens"] < b["prompt_tokens"]
+        or a["e2e_ms_p50"] < b["e2e_ms_p50"]
+    )
+    return no_worse and better
+
+
+def mark_pareto(results):
+    # フィルタ有無で対象の質問が異なるため、mode × filter の単位で比較する
+    for r in results:
+        peers = [o for o in results if o["mode"] == r["mode"] and o["filter"] == r["filter"]]
+        r["pareto"] = not any(dominates(o, r) for o in peers if o is not r)
+    return results
+
+
+def format_report(results):
+    lines = ["# Retrieval benchmark", ""]
+    for mode in MODE_INDEXES:
+        rows = [r for r in results if r["mode"] == mode]
+        if not rows:
+            continue
+        rows.sort(key=lambda r: (r["filter"], r["search_type"], r["k"]))
+        lines.append(f"## {mode} (現在の k={CURRENT_K[mode]})")
+        lines.append("")
+        lines.append("| search | filter | k | recall@k | MRR | tokens | retrieve p50 ms | e2e p50 ms | e2e p95 ms | pareto |")
+        lines.append("|---|---|---|---|---|---|---|---|---|---|")
+        for r in rows:
+            k_label = f"{r['k']} (現行)" if r["current"] else str(r["k"])
+            lines.append(
+                f"| {r['search_type']} | {'on' if r['filter'] else 'off'} | {k_label} "
+                f"| {r['recall_at_k']:.3f} | {r['mrr']:.3f} | {r['prompt_tokens']:.0f} "
+                f"| {r['retrieve_ms_p50']:.0f} | {r['e2e_ms_p50']:.0f} | {r['e2e_ms_p95']:.0f} "
+                f"| {'★' if r['pareto'] else ''} |"
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="検索品質 vs レイテンシのベンチマーク")
+    parser.add_argument("questions", help="ラベル付き質問セット (JSONL)")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K_VALUES, help="評価する k の一覧")
+    parser.add_argument("--search-types", nargs="+", default=DEFAULT_SEARCH_TYPES,
+                        choices=DEFAULT_SEARCH_TYPES, help="評価する検索方式")
+    parser.add_argument("--modes", nargs="+", default=list(MODE_INDEXES),
+                        choices=list(MODE_INDEXES), help="評価するモード")
+    parser.add_argument("--with-llm", action="store_true", help="LLM の回答生成まで含めてレイテンシを計測")
+    parser.add_argument("--output", default="retrieval_report", help="出力ファイル名 (拡張子なし)")
+    args = parser.parse_args()
+
+    questions = [q for q in load_questions(args.questions) if q["mode"] in args.modes]
+    if not questions:
+        logger.error("評価対象の質問がありません")
+        sys.exit(1)
+
+    embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+    stores = build_vectorstores(embeddings)
+    chat_llm = None
+    if args.with_llm:
+        chat_llm = ChatOpenAI(openai_api_key=OPENAI_API_KEY, model_name="gpt-4", temperature=0)
+
+    results = mark_pareto(evaluate(questions, stores, embeddings, sorted(set(args.k)), args.search_types, chat_llm))
+    report = format_report(results)
+
+    with open(f"{args.output}.json", "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    with open(f"{args.output}.md", "w", encoding="utf-8") as f:
+        f.write(report)
+    print(report)
+    logger.info(f"レポートを出力しました: {os.path.abspath(args.output)}.json / .md")
+
+
+if __name__ == '__main__':
+    main()
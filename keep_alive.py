@@ -1,16 +1,30 @@
 import os
 import imaplib
 import email
+import email.utils
 import re
+import base64
+import hashlib
+import json
+import queue
+import select
+import ssl
+import sys
+import threading
 import time
 import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from cryptography.fernet import Fernet, InvalidToken
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
 # 環境変数 LANG の設定（GitHub Actions の環境でも適用されるように）
@@ -19,15 +33,42 @@ os.environ["LC_ALL"] = "ja_JP.UTF-8"
 
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+STREAMLIT_SENDER = 'no-reply@streamlit.io'
+GITHUB_SENDER = 'noreply@github.com'
+# 検証コードのメールは小さいため、本文は先頭のみ部分取得する
+MAX_FETCH_BYTES = 64 * 1024
+# コード送信の操作時刻とメールの Date ヘッダーの時計のずれとして許容する範囲 (秒)
+MAIL_CLOCK_SKEW_SECONDS = 60
+# ログイン済みセッションの Cookie (streamlit.app のもののみ) を暗号化して保存し、次回以降も再利用する
+# (GitHub の Cookie を含むブラウザプロファイル全体は保存しない)
+SESSION_COOKIE_PATH = os.environ.get('SESSION_COOKIE_PATH', '.streamlit_session.enc')
+SESSION_COOKIE_KEY = os.environ.get('SESSION_COOKIE_KEY', '')
+SESSION_COOKIE_DOMAIN = 'streamlit.app'
+# 保存済みセッションの有効性を確認する際の待ち時間 (秒)
+SESSION_CHECK_TIMEOUT = 20
+SIGN_IN_XPATH = "//button[contains(text(), 'Sign in')]"
+# Streamlit Community Cloud がアプリ本体を埋め込む iframe
+APP_IFRAME_CSS = "iframe[title='streamlitApp'], iframe[src*='/~/+/']"
+# スリープ中のアプリに表示される起動ボタン
+WAKE_UP_XPATH = "//button[contains(text(), 'get this app back up')]"
+# 起動ボタンを押してからアプリ (iframe) が表示されるまでの待ち時間 (秒)
+APP_READY_TIMEOUT = 180
+
+DEFAULT_STREAMLIT_APPS = ["https://concur-dev-support.streamlit.app/"]
+# 同時に起動するブラウザ (ワーカー) 数の上限
+MAX_BROWSER_WORKERS = int(os.environ.get('MAX_BROWSER_WORKERS', 2))
+TIMING_REPORT_PATH = os.environ.get('TIMING_REPORT_PATH', 'keep_alive_timing.json')
+IMAP_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
 def is_streamlit_verification_email(email_message):
     try:
         from_address = email_message.get('from', '')
         from_header = email_message.get('From', '')
-        if 'no-reply@streamlit.io' not in from_address.lower() and 'no-reply@streamlit.io' not in from_header.lower():
+        if STREAMLIT_SENDER not in from_address.lower() and STREAMLIT_SENDER not in from_header.lower():
             return False
         for part in email_message.walk():
             if part.get_content_type() == 'text/plain':
@@ -42,7 +83,7 @@ def is_github_device_verification_email(email_message):
     try:
         from_address = email_message.get('from', '')
         from_header = email_message.get('From', '')
-        if 'noreply@github.com' not in from_address.lower() and 'noreply@github.com' not in from_header.lower():
+        if GITHUB_SENDER not in from_address.lower() and GITHUB_SENDER not in from_header.lower():
             return False
         for part in email_message.walk():
             if part.get_content_type() == 'text/plain':
@@ -59,12 +100,15 @@ def get_email_config():
         'password': os.environ.get('STREAMLIT_EMAIL_PASSWORD', ''),
         'imap_server': os.environ.get('EMAIL_IMAP_SERVER', 'mas22.kagoya.net'),
         'imap_port': int(os.environ.get('EMAIL_IMAP_PORT', 993)),
+        # ローカルのIMAPサーバーで検証する場合は EMAIL_IMAP_SSL=false で平文接続
+        'imap_ssl': os.environ.get('EMAIL_IMAP_SSL', 'true').lower() != 'false',
         'username': os.environ.get('EMAIL_USERNAME', '')
     }
     return config
 
 def login_imap(email_config):
-    mail = imaplib.IMAP4_SSL(email_config['imap_server'], email_config['imap_port'])
+    imap_class = imaplib.IMAP4_SSL if email_config.get('imap_ssl', True) else imaplib.IMAP4
+    mail = imap_class(email_config['imap_server'], email_config['imap_port'])
     for username in [email_config['email'], email_config['username']]:
         try:
             mail.login(username, email_config['password'])
@@ -75,29 +119,137 @@ def login_imap(email_config):
             logger.debug(f"{username} でのIMAPログイン失敗: {e}")
     raise ValueError("メールサーバーへのIMAPログインに失敗しました")
 
-def extract_streamlit_code(mail, max_wait_time=120):
+def imap_date(timestamp):
+    # IMAP の SINCE はロケールに依存しない英語の月名 (DD-Mon-YYYY) が必要
+    t = time.gmtime(timestamp)
+    return f"{t.tm_mday:02d}-{IMAP_MONTHS[t.tm_mon - 1]}-{t.tm_year}"
+
+def build_search_criteria(sender, not_before):
+    # SINCE は日付単位かつサーバーのタイムゾーンで評価されるため、1日前から検索する
+    criteria = ['UNSEEN', 'FROM', f'"{sender}"', 'SINCE', imap_date(not_before - 24 * 60 * 60)]
+    return '(' + ' '.join(criteria) + ')'
+
+def fetch_message_part(mail, uid, item):
+    typ, data = mail.uid('FETCH', uid, f'({item})')
+    if typ != 'OK':
+        return None
+    for entry in data:
+        if isinstance(entry, tuple):
+            return entry[1]
+    return None
+
+def is_recent_mail_from(raw_header, sender, not_before):
+    header = email.message_from_bytes(raw_header)
+    if sender not in header.get('From', '').lower():
+        return False
+    date_header = header.get('Date')
+    if not date_header:
+        return True
+    try:
+        sent_at = email.utils.parsedate_to_datetime(date_header).timestamp()
+    except (TypeError, ValueError):
+        return True
+    return sent_at >= not_before
+
+def supports_idle(mail):
+    try:
+        typ, data = mail.capability()
+    except imaplib.IMAP4.error:
+        return False
+    return typ == 'OK' and b'IDLE' in data[0].upper().split()
+
+def has_buffered_response(mail):
+    # 「+ idling」と同時に受信した通知は imaplib の mail.file (BufferedReader) に溜まり、
+    # select では検知できないため、ソケットを一時的にノンブロッキングにして peek で確認する
+    sock = mail.socket()
+    if getattr(sock, 'pending', lambda: 0)():
+        return True
+    original_timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(original_timeout)
+
+def idle_wait(mail, timeout):
+    """IMAP IDLE で新着通知を待つ。通知があれば True、タイムアウトなら False を返す。"""
+    tag = mail._new_tag()
+    mail.send(tag + b' IDLE\r\n')
+    line = mail.readline()
+    if not line.startswith(b'+'):
+        raise imaplib.IMAP4.error(f"IDLEの開始に失敗: {line!r}")
+    notified = False
+    try:
+        buffered = has_buffered_response(mail)
+        ready, _, _ = select.select([mail.socket()], [], [], 0 if buffered else timeout)
+        if buffered or ready:
+            line = mail.readline()
+            logger.info(f"[DEBUG] IMAP IDLE 通知: {line!r}")
+            notified = True
+    finally:
+        mail.send(b'DONE\r\n')
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("IDLE終了待ちの間に接続が切断されました")
+            if line.startswith(tag):
+                break
+    return notified
+
+def search_for_code(mail, criteria, sender, not_before, is_target_email, parse_code):
+    typ, data = mail.uid('SEARCH', None, criteria)
+    uids = data[0].split() if typ == 'OK' and data and data[0] else []
+    logger.info(f"[DEBUG] Search {criteria} -> UIDs: {uids}")
+    for uid in reversed(uids):
+        # まずヘッダーのみ取得して送信元・日時を確認し、本文は対象メールだけ部分取得する
+        raw_header = fetch_message_part(mail, uid, 'BODY.PEEK[HEADER.FIELDS (FROM DATE)]')
+        if not raw_header or not is_recent_mail_from(raw_header, sender, not_before):
+            continue
+        raw_email = fetch_message_part(mail, uid, f'BODY.PEEK[]<0.{MAX_FETCH_BYTES}>')
+        if not raw_email:
+            continue
+        email_message = email.message_from_bytes(raw_email)
+        if not is_target_email(email_message):
+            continue
+        code = parse_code(email_message)
+        if code:
+            # BODY.PEEK では既読にならないため、使用したコードのメールだけ既読にする
+            mail.uid('STORE', uid, '+FLAGS', '(\\Seen)')
+            return code
+    return None
+
+def wait_for_verification_code(mail, sender, is_target_email, parse_code, requested_at, max_wait_time=120, poll_interval=10):
+    # requested_at: コード送信の操作 (ボタンのクリック) 直前の時刻。それより前のメールは古いコードとして無視する
     start_time = time.time()
+    not_before = requested_at - MAIL_CLOCK_SKEW_SECONDS
+    criteria = build_search_criteria(sender, not_before)
     mail.select('inbox')
-    while time.time() - start_time < max_wait_time:
-        logger.info("[DEBUG] Searching UNSEEN mails for Streamlit code...")
-        _, unseen_data = mail.search(None, 'UNSEEN')
-        message_ids = unseen_data[0].split()
-        logger.info(f"[DEBUG] Found UNSEEN message IDs: {message_ids}")
-        code = search_for_streamlit_code_in_messages(mail, reversed(message_ids))
+    use_idle = supports_idle(mail)
+    logger.info(f"[DEBUG] IMAP IDLE: {'使用' if use_idle else '非対応のためポーリング'}")
+    while True:
+        code = search_for_code(mail, criteria, sender, not_before, is_target_email, parse_code)
         if code:
             return code
-        time.sleep(10)
-    return None
+        remaining = max_wait_time - (time.time() - start_time)
+        if remaining <= 0:
+            return None
+        wait = min(poll_interval, remaining)
+        if use_idle:
+            try:
+                idle_wait(mail, wait)
+                continue
+            except (imaplib.IMAP4.error, OSError) as e:
+                logger.warning(f"IMAP IDLE に失敗したためポーリングに切り替えます: {e}")
+                use_idle = False
+        time.sleep(wait)
 
-def search_for_streamlit_code_in_messages(mail, message_ids):
-    for num in message_ids:
-        _, data = mail.fetch(num, '(RFC822)')
-        raw_email = data[0][1]
-        email_message = email.message_from_bytes(raw_email)
-        if is_streamlit_verification_email(email_message):
-            logger.info("Streamlitワンタイムコードメールを検出 (UNSEEN)")
-            return parse_streamlit_code(email_message)
-    return None
+def extract_streamlit_code(mail, requested_at, max_wait_time=120):
+    logger.info("[DEBUG] Searching mails for Streamlit code...")
+    return wait_for_verification_code(
+        mail, STREAMLIT_SENDER, is_streamlit_verification_email, parse_streamlit_code, requested_at, max_wait_time
+    )
 
 def parse_streamlit_code(email_message):
     for part in email_message.walk():
@@ -111,29 +263,11 @@ def parse_streamlit_code(email_message):
                 return code
     return None
 
-def extract_github_device_code(mail, max_wait_time=120):
-    start_time = time.time()
-    mail.select('inbox')
-    while time.time() - start_time < max_wait_time:
-        logger.info("[DEBUG] Searching UNSEEN mails for GitHub device code...")
-        _, unseen_data = mail.search(None, 'UNSEEN')
-        message_ids = unseen_data[0].split()
-        logger.info(f"[DEBUG] Found UNSEEN message IDs for GitHub: {message_ids}")
-        code = search_for_github_device_code_in_messages(mail, reversed(message_ids))
-        if code:
-            return code
-        time.sleep(10)
-    return None
-
-def search_for_github_device_code_in_messages(mail, message_ids):
-    for num in message_ids:
-        _, data = mail.fetch(num, '(RFC822)')
-        raw_email = data[0][1]
-        email_message = email.message_from_bytes(raw_email)
-        if is_github_device_verification_email(email_message):
-            logger.info("GitHubデバイス認証メールを検出 (UNSEEN)")
-            return parse_github_device_code(email_message)
-    return None
+def extract_github_device_code(mail, requested_at, max_wait_time=120):
+    logger.info("[DEBUG] Searching mails for GitHub device code...")
+    return wait_for_verification_code(
+        mail, GITHUB_SENDER, is_github_device_verification_email, parse_github_device_code, requested_at, max_wait_time
+    )
 
 def parse_github_device_code(email_message):
     for part in email_message.walk():
@@ -164,15 +298,17 @@ def login_to_github_if_needed(driver):
         password_input.send_keys(gh_pass)
         logger.info("[DEBUG] GitHub パスワードを入力 (マスク)")
         sign_in_button = driver.find_element(By.NAME, "commit")
+        # デバイス認証メールはこのクリックで送信される
+        requested_at = time.time()
         sign_in_button.click()
         logger.info("GitHub 'Sign in' ボタンをクリック")
         WebDriverWait(driver, 15).until_not(EC.url_contains("github.com/login"))
         logger.info("GitHubログイン処理完了(または次ステップに遷移)")
-        handle_github_device_verification(driver)
+        handle_github_device_verification(driver, requested_at)
     except Exception as e:
         logger.info(f"GitHub login page was not found or not needed: {e}")
 
-def handle_github_device_verification(driver):
+def handle_github_device_verification(driver, requested_at):
     try:
         otp_field = WebDriverWait(driver, 3).until(
             EC.presence_of_element_located((By.NAME, "otp"))
@@ -180,7 +316,7 @@ def handle_github_device_verification(driver):
         logger.info("Detected GitHub Device Verification page. Retrieving code from email...")
         email_config = get_email_config()
         mail = login_imap(email_config)
-        device_code = extract_github_device_code(mail)
+        device_code = extract_github_device_code(mail, requested_at)
         if not device_code:
             raise ValueError("GitHubデバイス認証コードの取得に失敗しました")
         otp_field.clear()
@@ -201,10 +337,10 @@ def handle_github_device_verification(driver):
     except Exception as e:
         logger.error(f"Device verification中に予期せぬエラーが発生: {e}")
 
-def login_to_streamlit(driver, email):
+def login_to_streamlit(driver, email, app_url, screenshot_prefix='screenshot'):
     try:
         sign_in_btn = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Sign in')]"))
+            EC.element_to_be_clickable((By.XPATH, SIGN_IN_XPATH))
         )
         sign_in_btn.click()
         logger.info("Sign in ボタンをクリック")
@@ -216,14 +352,14 @@ def login_to_streamlit(driver, email):
         logger.info(f"メール '{email}' を入力")
         cont_btn = driver.find_element(By.XPATH, "//button[contains(text(), 'Continue')]")
         logger.info("ワンタイムコード送信用の Continueボタンをクリック(一度だけ)")
+        requested_at = time.time()
         cont_btn.click()
-        time.sleep(2)
         code_inputs = WebDriverWait(driver, 30).until(
             EC.presence_of_all_elements_located((By.XPATH, "//input[@maxlength='1' and @inputmode='numeric']"))
         )
         email_config = get_email_config()
         mail = login_imap(email_config)
-        st_code = extract_streamlit_code(mail)
+        st_code = extract_streamlit_code(mail, requested_at)
         if not st_code:
             raise ValueError("Streamlitワンタイムコードを取得できませんでした")
         if len(code_inputs) == 6:
@@ -234,57 +370,299 @@ def login_to_streamlit(driver, email):
             raise ValueError(f"入力フィールド数が不正: {len(code_inputs)}")
         login_to_github_if_needed(driver)
         # ★ログイン後に管理画面に遷移してしまう場合は、明示的にアプリURLに再アクセスする
-        driver.get("https://concur-dev-support.streamlit.app/")
+        driver.get(app_url)
         logger.info("アプリURLに再アクセスして、実際のアプリ画面を表示")
         WebDriverWait(driver, 60).until(EC.url_contains("streamlit.app"))
         logger.info("Streamlitログイン成功")
     except Exception as e:
         logger.error(f"ログイン中にエラー: {e}")
-        driver.save_screenshot('screenshot_login_error.png')
+        driver.save_screenshot(f'{screenshot_prefix}_login_error.png')
         raise
 
-def visit_streamlit_app(url, email):
+def get_chromedriver_path():
+    # CHROMEDRIVER_PATH、または GitHub Actions の ubuntu ランナーに同梱されている
+    # ChromeDriver (CHROMEWEBDRIVER、インストール済みの Chrome と同じバージョン) があればダウンロードしない
+    candidates = [os.environ.get('CHROMEDRIVER_PATH', '')]
+    if os.environ.get('CHROMEWEBDRIVER'):
+        candidates.append(os.path.join(os.environ['CHROMEWEBDRIVER'], 'chromedriver'))
+    for driver_path in candidates:
+        if driver_path and os.path.exists(driver_path):
+            logger.info(f"インストール済みの ChromeDriver を使用: {driver_path}")
+            return driver_path
+    return ChromeDriverManager().install()
+
+def get_cookie_cipher():
+    if not SESSION_COOKIE_KEY:
+        return None
+    # 任意の文字列のシークレットから Fernet 用の32バイト鍵を作る
+    key = base64.urlsafe_b64encode(hashlib.sha256(SESSION_COOKIE_KEY.encode()).digest())
+    return Fernet(key)
+
+def is_session_cookie(cookie):
+    domain = cookie.get('domain', '').lstrip('.')
+    return domain == SESSION_COOKIE_DOMAIN or domain.endswith('.' + SESSION_COOKIE_DOMAIN)
+
+def session_store_mtime(path=SESSION_COOKIE_PATH):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def load_session_cookies(path=SESSION_COOKIE_PATH):
+    cipher = get_cookie_cipher()
+    if cipher is None or not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'rb') as f:
+            return json.loads(cipher.decrypt(f.read()))
+    except (InvalidToken, ValueError) as e:
+        logger.warning(f"保存済みセッションを復号できなかったため破棄します: {e}")
+        return []
+
+def save_session_cookies(driver, path=SESSION_COOKIE_PATH):
+    cipher = get_cookie_cipher()
+    if cipher is None:
+        logger.info("SESSION_COOKIE_KEY が未設定のため、セッションは保存しません")
+        return
+    new_cookies = [c for c in driver.get_cookies() if is_session_cookie(c)]
+    if not new_cookies:
+        return
+    # 他のアプリ用に保存済みの Cookie は残し、同じ Cookie だけを置き換える
+    new_keys = {(c['name'], c.get('domain'), c.get('path')) for c in new_cookies}
+    cookies = [
+        c for c in load_session_cookies(path)
+        if (c['name'], c.get('domain'), c.get('path')) not in new_keys
+    ] + new_cookies
+    with open(path, 'wb') as f:
+        f.write(cipher.encrypt(json.dumps(cookies).encode()))
+    logger.info(f"セッション Cookie を保存しました ({len(new_cookies)} 件)")
+
+def restore_session_cookies(driver, cookies):
+    # add_cookie は現在表示中のドメインの Cookie しか追加できない
+    host = urlparse(driver.current_url).hostname or ''
+    restored = 0
+    for cookie in cookies:
+        domain = cookie.get('domain', '')
+        if not (host == domain.lstrip('.') or host.endswith('.' + domain.lstrip('.'))):
+            continue
+        if cookie.get('expiry') and cookie['expiry'] < time.time():
+            continue
+        restored_cookie = {
+            k: cookie[k] for k in ('name', 'value', 'path', 'secure', 'httpOnly', 'expiry', 'sameSite')
+            if k in cookie
+        }
+        # ホスト限定の Cookie はドメインを指定せずに現在のホストへ追加する
+        if domain.startswith('.'):
+            restored_cookie['domain'] = domain
+        try:
+            driver.add_cookie(restored_cookie)
+            restored += 1
+        except Exception as e:
+            logger.debug(f"Cookie {cookie['name']} の復元に失敗: {e}")
+    return restored
+
+def is_session_valid(driver, timeout=SESSION_CHECK_TIMEOUT):
+    # Sign in ボタン・起動ボタン・アプリの iframe のいずれかが表示されるまで待ち、どれが出たかで判定する
+    try:
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            EC.presence_of_element_located((By.XPATH, SIGN_IN_XPATH)),
+            EC.presence_of_element_located((By.XPATH, WAKE_UP_XPATH)),
+            EC.presence_of_element_located((By.CSS_SELECTOR, APP_IFRAME_CSS))
+        ))
+    except TimeoutException:
+        # 何も確認できないページを有効なセッションとは見なさない
+        logger.info("セッション確認: Sign in ボタン・起動ボタン・アプリのいずれも検出できませんでした")
+        return False
+    if "github.com/login" in driver.current_url:
+        return False
+    return not driver.find_elements(By.XPATH, SIGN_IN_XPATH)
+
+def create_driver(driver_path):
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
     # 日本語表示のための言語設定を追加
     options.add_argument('--lang=ja-JP')
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    return webdriver.Chrome(service=Service(driver_path), options=options)
+
+@contextmanager
+def timed_step(record, name):
+    step = {"name": name, "status": "ok"}
+    start = time.perf_counter()
     try:
+        yield step
+    except Exception:
+        step["status"] = "error"
+        raise
+    finally:
+        step["seconds"] = round(time.perf_counter() - start, 3)
+        record["steps"].append(step)
+        logger.info(f"{record['app']} [{name}] {step['status']} ({step['seconds']:.2f}秒)")
+
+def wake_streamlit_app(driver, url, email, login_lock, record, screenshot_prefix):
+    with timed_step(record, "open"):
         driver.get(url)
         logger.info(f"URLにアクセス: {url}")
-        driver.save_screenshot("debug_screenshot_0_initial.png")
-        login_to_streamlit(driver, email)
-        time.sleep(5)
-        driver.save_screenshot('screenshot_after_login.png')
-        logger.info("ログイン後のスクリーンショットを保存")
-    except Exception as e:
-        logger.error(f"{url} の訪問中にエラー: {e}")
-        driver.save_screenshot('screenshot_error.png')
-        raise
+    driver.save_screenshot(f"debug_{screenshot_prefix}_0_initial.png")
+
+    with timed_step(record, "restore_session") as step:
+        store_mtime = session_store_mtime()
+        step["cookies"] = restore_session_cookies(driver, load_session_cookies())
+        logger.info(f"{url} 用に復元した Cookie: {step['cookies']} 件")
+        if step["cookies"]:
+            driver.get(url)
+
+    with timed_step(record, "session_check") as step:
+        session_valid = is_session_valid(driver)
+        step["session_valid"] = session_valid
+
+    if session_valid:
+        logger.info("保存済みのセッションが有効なため、ログインをスキップします")
+    else:
+        # ワンタイムコードのメールを取り違えないよう、ログインは同時に1ワーカーのみ
+        with timed_step(record, "login_wait"):
+            login_lock.acquire()
+        try:
+            # 待っている間に他のワーカーがこのアプリ (ホスト) の Cookie を保存していれば、それを使う
+            # (別アプリのホスト限定 Cookie は復元できないため、その場合はログインが必要)
+            if session_store_mtime() != store_mtime:
+                with timed_step(record, "restore_session") as step:
+                    step["cookies"] = restore_session_cookies(driver, load_session_cookies())
+                    logger.info(f"{url} 用に復元した Cookie (他ワーカーの保存分): {step['cookies']} 件")
+                    if step["cookies"]:
+                        driver.get(url)
+                        session_valid = is_session_valid(driver)
+                    step["session_valid"] = session_valid
+            if not session_valid:
+                with timed_step(record, "login"):
+                    logger.info("セッションが無効または期限切れのため、ログインします")
+                    login_to_streamlit(driver, email, url, screenshot_prefix)
+                    save_session_cookies(driver)
+        finally:
+            login_lock.release()
+
+    with timed_step(record, "wake") as step:
+        # 起動ボタンは非同期に描画されるため、起動ボタンかアプリのどちらかが表示されるまで待ってから判定する
+        try:
+            WebDriverWait(driver, SESSION_CHECK_TIMEOUT).until(EC.any_of(
+                EC.presence_of_element_located((By.XPATH, WAKE_UP_XPATH)),
+                EC.presence_of_element_located((By.CSS_SELECTOR, APP_IFRAME_CSS))
+            ))
+        except TimeoutException:
+            logger.info("起動ボタンもアプリも表示されないため、app_ready で待機を続けます")
+        wake_buttons = driver.find_elements(By.XPATH, WAKE_UP_XPATH)
+        step["sleeping"] = bool(wake_buttons)
+        if wake_buttons:
+            wake_buttons[0].click()
+            logger.info("スリープ中のアプリの起動ボタンをクリック")
+
+    with timed_step(record, "app_ready") as step:
+        try:
+            WebDriverWait(driver, APP_READY_TIMEOUT).until(EC.all_of(
+                EC.invisibility_of_element_located((By.XPATH, WAKE_UP_XPATH)),
+                EC.presence_of_element_located((By.CSS_SELECTOR, APP_IFRAME_CSS))
+            ))
+        except TimeoutException:
+            step["status"] = "timeout"
+            logger.warning(f"{url} のアプリ表示を {APP_READY_TIMEOUT} 秒以内に確認できませんでした")
+
+    driver.save_screenshot(f'{screenshot_prefix}_after_login.png')
+    logger.info("ログイン後のスクリーンショットを保存")
+    return step["status"]
+
+def browser_worker(worker_id, app_queue, email, driver_path, login_lock, report):
+    driver = None
+    try:
+        while True:
+            try:
+                url = app_queue.get_nowait()
+            except queue.Empty:
+                return
+            record = {"app": url, "worker": worker_id, "steps": []}
+            report["apps"].append(record)
+            screenshot_prefix = "screenshot_" + urlparse(url).netloc.replace('.', '_')
+            start = time.perf_counter()
+            try:
+                if driver is None:
+                    with timed_step(record, "launch_browser"):
+                        driver = create_driver(driver_path)
+                record["status"] = wake_streamlit_app(driver, url, email, login_lock, record, screenshot_prefix)
+            except Exception as e:
+                logger.error(f"{url} の訪問中にエラー: {e}")
+                record["status"] = "error"
+                record["error"] = str(e)
+                if driver is not None:
+                    # 状態が不明なブラウザは破棄し、次のアプリでは起動し直す
+                    try:
+                        driver.save_screenshot(f'{screenshot_prefix}_error.png')
+                        driver.quit()
+                    except Exception as quit_error:
+                        logger.warning(f"エラー後のブラウザ終了に失敗: {quit_error}")
+                    driver = None
+            finally:
+                record["total_seconds"] = round(time.perf_counter() - start, 3)
     finally:
-        driver.quit()
-        logger.info("ブラウザを閉じました")
+        if driver is not None:
+            driver.quit()
+            logger.info("ブラウザを閉じました")
+
+def get_streamlit_apps():
+    # STREAMLIT_APPS (カンマ区切り) で対象アプリを上書きできる
+    apps = [a.strip() for a in os.environ.get('STREAMLIT_APPS', '').split(',') if a.strip()]
+    return apps or DEFAULT_STREAMLIT_APPS
+
+def write_timing_report(report, path=TIMING_REPORT_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"タイミングレポートを出力: {path}")
 
 def main():
     email_config = get_email_config()
     target_email = email_config['email']
     if not target_email:
         raise ValueError("STREAMLIT_EMAIL が設定されていないため、メールアドレス不明")
-    streamlit_apps = ["https://concur-dev-support.streamlit.app/"]
+    streamlit_apps = get_streamlit_apps()
+    worker_count = max(1, min(MAX_BROWSER_WORKERS, len(streamlit_apps)))
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "workers": worker_count,
+        "apps": []
+    }
+    start = time.perf_counter()
+    app_queue = queue.Queue()
     for app_url in streamlit_apps:
+        app_queue.put(app_url)
+    login_lock = threading.Lock()
+    try:
+        # ダウンロードが競合しないよう、ChromeDriver はワーカー起動前に1度だけ解決する
         try:
-            visit_streamlit_app(app_url, target_email)
+            driver_path = get_chromedriver_path()
         except Exception as e:
-            logger.error(f"{app_url} の訪問中にエラー: {e}")
-        time.sleep(5)
+            report["error"] = f"ChromeDriver の取得に失敗: {e}"
+            raise
+        finally:
+            report["driver_setup_seconds"] = round(time.perf_counter() - start, 3)
+
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="browser") as executor:
+            futures = [
+                executor.submit(browser_worker, i, app_queue, target_email, driver_path, login_lock, report)
+                for i in range(worker_count)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        report["total_seconds"] = round(time.perf_counter() - start, 3)
+        write_timing_report(report)
+
+    # アプリの表示まで確認できなかったものを返す
+    ready_apps = {a["app"] for a in report["apps"] if a.get("status") == "ok"}
+    return [app_url for app_url in streamlit_apps if app_url not in ready_apps]
 
 if __name__ == '__main__':
     start_time = time.time()
     logger.info("Keep-Alive ジョブ開始")
-    main()
+    not_ready_apps = main()
     end_time = time.time()
     logger.info(f"Keep-Alive ジョブ終了 (所要時間: {end_time - start_time:.2f}秒)")
+    if not_ready_apps:
+        logger.error(f"起動を確認できなかったアプリ: {not_ready_apps}")
+        sys.exit(1)
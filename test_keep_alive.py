@@ -0,0 +1,206 @@
+"""
+keep_alive.py のワンタイムコード取得 (IMAP 検索・IDLE・ポーリング) のテスト
+
+ソケットで動く簡易 IMAP サーバーを立て、EMAIL_IMAP_SSL=false 相当の平文接続で検証する。
+    python -m unittest test_keep_alive
+"""
+import socket
+import threading
+import time
+import unittest
+from email.utils import formatdate
+
+try:
+    import keep_alive
+except ImportError:  # selenium 等の依存パッケージがない環境
+    keep_alive = None
+
+
+def make_code_mail(code, sent_at):
+    return (
+        "From: Streamlit <no-reply@streamlit.io>\r\n"
+        f"Date: {formatdate(sent_at)}\r\n"
+        "Content-Type: text/plain\r\n"
+        "\r\n"
+        f"Your one-time code is: {code}\r\n"
+    ).encode()
+
+
+class FakeImapServer:
+    """1接続だけを受け付ける最小限の IMAP サーバー (UID SEARCH/FETCH/STORE と IDLE のみ対応)"""
+
+    def __init__(self, idle=True):
+        self.idle = idle
+        self.messages = {}
+        self.seen = set()
+        self.commands = []
+        # IDLE 開始時に届けるメール: (遅延秒数, uid, 本文, "+ idling" と同じパケットで送るか)
+        self.deliver_on_idle = None
+        self._send_lock = threading.Lock()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def add_message(self, uid, raw):
+        self.messages[uid] = raw
+
+    def add_message_later(self, delay, uid, raw):
+        timer = threading.Timer(delay, self.add_message, args=(uid, raw))
+        timer.daemon = True
+        timer.start()
+
+    def close(self):
+        self._server.close()
+
+    def _send(self, conn, data):
+        with self._send_lock:
+            conn.sendall(data if isinstance(data, bytes) else data.encode())
+
+    def _serve(self):
+        conn, _ = self._server.accept()
+        reader = conn.makefile('rb')
+        self._send(conn, "* OK fake IMAP ready\r\n")
+        with conn:
+            while True:
+                line = reader.readline()
+                if not line:
+                    return
+                tag, command, *rest = line.decode().rstrip('\r\n').split(' ', 2)
+                args = rest[0] if rest else ''
+                self.commands.append(f"{command.upper()} {args}".strip())
+                self._handle(conn, reader, tag, command.upper(), args)
+
+    def _handle(self, conn, reader, tag, command, args):
+        if command == 'CAPABILITY':
+            caps = "IMAP4rev1 IDLE" if self.idle else "IMAP4rev1"
+            self._send(conn, f"* CAPABILITY {caps}\r\n{tag} OK CAPABILITY completed\r\n")
+        elif command == 'SELECT':
+            self._send(conn, f"* {len(self.messages)} EXISTS\r\n{tag} OK [READ-WRITE] SELECT completed\r\n")
+        elif command == 'IDLE':
+            self._handle_idle(conn, reader, tag)
+        elif command == 'UID':
+            self._handle_uid(conn, tag, args)
+        else:
+            self._send(conn, f"{tag} OK {command} completed\r\n")
+
+    def _handle_idle(self, conn, reader, tag):
+        delivery, self.deliver_on_idle = self.deliver_on_idle, None
+        if delivery and delivery[3]:
+            _, uid, raw, _ = delivery
+            self.add_message(uid, raw)
+            self._send(conn, f"+ idling\r\n* {len(self.messages)} EXISTS\r\n")
+        else:
+            self._send(conn, "+ idling\r\n")
+            if delivery:
+                delay, uid, raw, _ = delivery
+
+                def push():
+                    self.add_message(uid, raw)
+                    self._send(conn, f"* {len(self.messages)} EXISTS\r\n")
+                timer = threading.Timer(delay, push)
+                timer.daemon = True
+                timer.start()
+        reader.readline()  # DONE
+        self._send(conn, f"{tag} OK IDLE terminated\r\n")
+
+    def _handle_uid(self, conn, tag, args):
+        sub_command, _, rest = args.partition(' ')
+        sub_command = sub_command.upper()
+        if sub_command == 'SEARCH':
+            uids = " ".join(str(uid) for uid in sorted(self.messages) if uid not in self.seen)
+            self._send(conn, f"* SEARCH {uids}\r\n{tag} OK SEARCH completed\r\n")
+        elif sub_command == 'FETCH':
+            uid_text, _, item = rest.partition(' ')
+            raw = self.messages[int(uid_text)]
+            if 'HEADER' in item:
+                raw = raw.split(b'\r\n\r\n')[0] + b'\r\n\r\n'
+            self._send(
+                conn,
+                f"* 1 FETCH (UID {uid_text} BODY[] {{{len(raw)}}}\r\n".encode() + raw
+                + f")\r\n{tag} OK FETCH completed\r\n".encode()
+            )
+        elif sub_command == 'STORE':
+            self.seen.add(int(rest.split(' ')[0]))
+            self._send(conn, f"{tag} OK STORE completed\r\n")
+        else:
+            self._send(conn, f"{tag} BAD unsupported\r\n")
+
+
+@unittest.skipIf(keep_alive is None, "keep_alive の依存パッケージがインストールされていません")
+class VerificationCodeTest(unittest.TestCase):
+
+    def connect(self, server):
+        mail = keep_alive.login_imap({
+            'imap_server': '127.0.0.1',
+            'imap_port': server.port,
+            'imap_ssl': False,
+            'email': 'user@example.com',
+            'username': '',
+            'password': 'password',
+        })
+        self.addCleanup(mail.shutdown)
+        return mail
+
+    def start_server(self, idle=True):
+        server = FakeImapServer(idle=idle)
+        self.addCleanup(server.close)
+        return server
+
+    def test_existing_code_is_returned_and_stale_code_is_ignored(self):
+        server = self.start_server()
+        requested_at = time.time()
+        server.add_message(1, make_code_mail('111111', requested_at - 5 * 60))
+        server.add_message(2, make_code_mail('222222', requested_at))
+        mail = self.connect(server)
+
+        self.assertEqual(keep_alive.extract_streamlit_code(mail, requested_at, max_wait_time=5), '222222')
+        self.assertEqual(server.seen, {2})
+        self.assertNotIn('IDLE', server.commands)
+
+    def test_code_pushed_during_idle(self):
+        server = self.start_server()
+        requested_at = time.time()
+        server.deliver_on_idle = (1, 3, make_code_mail('333333', requested_at), False)
+        mail = self.connect(server)
+
+        start = time.time()
+        code = keep_alive.extract_streamlit_code(mail, requested_at, max_wait_time=30)
+        self.assertEqual(code, '333333')
+        # ポーリング間隔 (10秒) を待たずに、通知直後に取得できること
+        self.assertLess(time.time() - start, 5)
+        self.assertIn('IDLE', server.commands)
+
+    def test_exists_buffered_with_idle_continuation(self):
+        server = self.start_server()
+        requested_at = time.time()
+        server.deliver_on_idle = (0, 4, make_code_mail('444444', requested_at), True)
+        mail = self.connect(server)
+
+        start = time.time()
+        code = keep_alive.extract_streamlit_code(mail, requested_at, max_wait_time=30)
+        self.assertEqual(code, '444444')
+        self.assertLess(time.time() - start, 2)
+
+    def test_polling_fallback_without_idle(self):
+        server = self.start_server(idle=False)
+        requested_at = time.time()
+        server.add_message_later(0.5, 5, make_code_mail('555555', requested_at))
+        mail = self.connect(server)
+
+        code = keep_alive.wait_for_verification_code(
+            mail,
+            keep_alive.STREAMLIT_SENDER,
+            keep_alive.is_streamlit_verification_email,
+            keep_alive.parse_streamlit_code,
+            requested_at,
+            max_wait_time=10,
+            poll_interval=0.5
+        )
+        self.assertEqual(code, '555555')
+        self.assertNotIn('IDLE', server.commands)
+
+
+if __name__ == '__main__':
+    unittest.main()